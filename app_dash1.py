@@ -1,13 +1,19 @@
 # import cProfile
 
-from dash import Dash, html, dcc, Input, Output, Patch, callback, ALL, State, callback_context, no_update
+from dash import Dash, html, dcc, Input, Output, Patch, ALL, State, callback_context, no_update
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
-from pyminsky import minsky
+from flask import jsonify
+from array import array
+from frame_channel import FrameChannel
+from model_pool import ModelPool
+from sessions import SessionLimitError, SessionRegistry
+from wire import COMPACT, DECODE_BATCH_JS, FORMAT_LATEST_JS, WireStats, encode_frames, encode_latest, load_wire_settings, patch_frames
 import threading
-import queue
 import time
 import json
+import uuid
 import re
 import os
 
@@ -15,34 +21,32 @@ import os
 extra_files = ['config.json']
 
 # Load configuration from JSON file
-def load_config():
-    with open('config.json', 'r') as f:
+def load_config(config_file='config.json'):
+    with open(config_file, 'r') as f:
         config = json.load(f)
-        return config['figs'], config['sliders']
+        return config['figs'], config['sliders'], config.get('settings', {})
 
-# Initial load of configuration
-figs, sliders = load_config()
 
-# make a list of all the traces
-traces = []
-for fig_config in figs:
-    sublist = []
-    for trace in fig_config["traces"]:
-        trace["id"] = trace["variable"].replace(':', '').replace('{', '').replace('}', '').replace('^', '').replace('%', '')
-        sublist.append(trace)
-    traces.append(sublist)
-
-print([(trace["name"], trace["id"]) for sublist in traces for trace in sublist])
+def make_traces(figs):
+    # make a list of all the traces
+    traces = []
+    for fig_config in figs:
+        sublist = []
+        for trace in fig_config["traces"]:
+            trace["id"] = trace["variable"].replace(':', '').replace('{', '').replace('}', '').replace('^', '').replace('%', '')
+            sublist.append(trace)
+        traces.append(sublist)
+    return traces
 
 
 def translate_minsky_var(var_name, to_latex=True):
     """
     Translate Minsky variable names between HTML and LaTeX formats.
-    
+
     Args:
         var_name (str): The variable name to translate
         to_latex (bool): If True, convert from HTML to LaTeX format. If False, convert from LaTeX to HTML.
-    
+
     Returns:
         str: The translated variable name
     """
@@ -58,77 +62,157 @@ def translate_minsky_var(var_name, to_latex=True):
         var_name = re.sub(r'\^{([^}]+)}', r'<sup>\1</sup>', var_name)
     return var_name
 
-def get_minsky_var(var_name):
+def get_minsky_var(model, var_name):
     """
     Get a Minsky variable value, handling both HTML and LaTeX formats.
-    
+
     Args:
+        model: The Minsky model to read from
         var_name (str): The variable name in either HTML or LaTeX format
-    
+
     Returns:
         The value of the Minsky variable
     """
     html_name = translate_minsky_var(var_name, to_latex=False)
-    return minsky.variableValues[html_name].value()
+    return model.variableValues[html_name].value()
 
-def set_minsky_var(var_name, value):
+def set_minsky_var(model, var_name, value):
     """
     Set a Minsky variable value, handling both HTML and LaTeX formats.
-    
+
     Args:
+        model: The Minsky model to update
         var_name (str): The variable name in either HTML or LaTeX format
         value: The value to set
     """
     html_name = translate_minsky_var(var_name, to_latex=False)
-    minsky.variableValues[html_name].setValue(value)
+    model.variableValues[html_name].setValue(value)
+
 
+# Integrator settings a solver profile may set, see config.json settings.solver_profiles
+SOLVER_PARAMS = ('order', 'implicit', 'stepMin', 'stepMax', 'epsAbs', 'epsRel')
 
-# Thread-safe queue for simulation results with max size of 5
-simulation_queue = queue.Queue(maxsize=5)
+# Used when config.json does not define any solver profiles
+DEFAULT_SOLVER_PROFILES = {
+    "balanced": {
+        "order": 4,  # 4th order Runge-Kutta
+        "implicit": 0,  # Explicit integration
+    },
+}
+
+def load_solver_profiles(settings):
+    """
+    Get the named solver profiles and the default profile name from the config settings.
+
+    Args:
+        settings (dict): The settings section of config.json
+
+    Returns:
+        tuple: (dict of profile name to integrator settings, default profile name)
+    """
+    profiles = settings.get('solver_profiles', DEFAULT_SOLVER_PROFILES)
+    for name, profile in profiles.items():
+        unknown = set(profile) - set(SOLVER_PARAMS)
+        if unknown:
+            raise ValueError(f"Solver profile {name!r} has unknown settings {sorted(unknown)}, expected {SOLVER_PARAMS}")
+    default = settings.get('solver_profile', next(iter(profiles)))
+    if default not in profiles:
+        raise ValueError(f"Default solver profile {default!r} is not one of {list(profiles)}")
+    return profiles, default
+
+def solver_defaults(model):
+    # Integrator settings of a freshly loaded model, used for settings a profile leaves out
+    return {name: getattr(model, name)() for name in SOLVER_PARAMS}
+
+def complete_solver_profiles(profiles, defaults):
+    # Fill in every SOLVER_PARAMS setting, so switching profiles does not keep the previous one's settings
+    return {name: {**defaults, **profile} for name, profile in profiles.items()}
+
+def prepare_model(model, profile):
+    # Apply a solver profile's integrator settings to a model taken from the pool.
+    # Minsky only picks them up when it rebuilds the ODE driver, so reset afterwards;
+    # set policy variables after this.
+    for name, value in profile.items():
+        getattr(model, name)(value)
+    model.reset()
+    return model
 
-# Add at the top of the file with other global variables
-policy_change_times = []
 
 class SimulationThread(threading.Thread):
-    def __init__(self):
+    def __init__(self, model, figs, traces, simulation_queue):
         super().__init__()
         self.daemon = True  # Thread will exit when main program exits
         self.running = True
         self.steps_per_update = 10
+        self.model = model
+        self.figs = figs
+        self.traces = traces
+        self.simulation_queue = simulation_queue
+        self.lock = threading.Lock()  # held while using the model, so it can be swapped safely
+
+        # Frame layout: simulation time followed by every trace value, figure by figure.
+        # trace_offsets[i] is the index of the first value of figure i in a frame.
+        self.trace_offsets = []
+        self.var_names = []
+        self.multipliers = [1]
+        for sublist in traces:
+            self.trace_offsets.append(1 + len(self.var_names))
+            for trace in sublist:
+                self.var_names.append(translate_minsky_var(trace["variable"], to_latex=False))
+                self.multipliers.append(trace["multiplier"])
+        self.frame = array('d', bytes(8 * len(self.multipliers)))  # reused for every published frame
+
+    def swap_model(self, model, simulation_queue):
+        # Replace the model and its frame channel, returning the previous model.
+        # A frame still being published from the old model lands in the old channel, which
+        # is cleared first so a producer blocked on it (block policy) can finish.
+        self.simulation_queue.clear()
+        with self.lock:
+            old_model, self.model = self.model, model
+            self.simulation_queue = simulation_queue
+        return old_model
+
+    def stop(self):
+        # Let run() return, waking the producer if it is blocked on a full channel
+        self.running = False
+        self.simulation_queue.clear()
 
     def get_queue_length(self):
-        return simulation_queue.qsize()
+        return self.simulation_queue.qsize()
 
     def get_results(self, flatten=False):
         # Get current values
-        sim_time = minsky.t()
+        with self.lock:
+            values = self.model.read(self.var_names)
         results = []
-        results.append([sim_time])
-        
-        # Iterate through all traces in figs to get values
-        for fig_config in figs:
-            graphs = []
-            for trace in fig_config["traces"]:
-                var_name = trace["variable"]
-                graphs.append(get_minsky_var(var_name) * trace["multiplier"])
-            results.append(graphs)
-        
+        results.append([values[0]])
+
+        # Group values by figure
+        for i, sublist in enumerate(self.traces):
+            offset = self.trace_offsets[i]
+            results.append([values[offset + j] * trace["multiplier"] for j, trace in enumerate(sublist)])
+
         return results if not flatten else self.flatten(results)
 
+    def fill_frame(self, frame, values):
+        # Write values returned by the model into a preallocated frame (see trace_offsets)
+        for i, value in enumerate(values):
+            frame[i] = value * self.multipliers[i]
+        return frame
 
     def get_results_dict(self):
         results = self.get_results()
         return {
             'time': results[0],
-            **{trace['id']: results[i+1][j] for i, trace in enumerate(traces) for j, _ in enumerate(trace['traces'])}
+            **{trace['id']: results[i+1][j] for i, trace in enumerate(self.traces) for j, _ in enumerate(trace['traces'])}
         }
-    
+
     def get_trace_names(self, flatten=False):
-        return [trace['name'] for trace in traces] if not flatten else [trace['name'] for sublist in traces for trace in sublist]
-    
+        return [trace['name'] for trace in self.traces] if not flatten else [trace['name'] for sublist in self.traces for trace in sublist]
+
     def get_trace_ids(self):
-        return [trace['id'] for trace in traces]
-    
+        return [trace['id'] for trace in self.traces]
+
     def flatten(self, matrix):
         flat_list = []
         for row in matrix:
@@ -138,52 +222,29 @@ class SimulationThread(threading.Thread):
 
     def run(self):
         while self.running:
-            if minsky.running():
-                # Run simulation steps
-                for _ in range(self.steps_per_update):
-                    minsky.step()
-                
-                # Get current values
-                results = self.get_results()
-                simulation_queue.put(results)
-            
-            time.sleep(0.1)  # Small sleep to prevent CPU hogging
-
-# Create and start simulation thread
-sim_thread = SimulationThread()
-sim_thread.start()
-
-# Create the Dash application with the correct configuration
-app = Dash(
-    __name__,
-    external_stylesheets=[
-        dbc.themes.SPACELAB, 
-        dbc.icons.FONT_AWESOME,
-    ],
-    # url_base_pathname='/d1/',
-    # assets_folder='static',
-    # assets_url_path='/static'
-)
+            values = None
+            with self.lock:
+                simulation_queue = self.simulation_queue
+                if self.model.running():
+                    # Run simulation steps and read the traces in one round trip
+                    values = self.model.step_and_read(self.steps_per_update, self.var_names)
+
+            if values is not None:
+                # Publish current values without holding the lock, the channel policy decides
+                # what happens when it is full (block waits for the consumer)
+                simulation_queue.publish(self.fill_frame(self.frame, values))
 
-# Expose the Flask server for FastAPI
-server = app.server
+            time.sleep(0.1)  # Small sleep to prevent CPU hogging
 
-# Initialize the Minsky model
-model_file = "BOMDwithGovernmentLive.mky"
-minsky.load(model_file)
-minsky.reset()
-minsky.order(4)  # 4th order Runge-Kutta
-minsky.implicit(0)  # Explicit integration
-minsky.running(True)  # Start in running state
 
-def show_minsky_variables():
-    # print(minsky.variableValues.keys())
+def show_minsky_variables(model):
+    # print(model.variableValues.keys())
     stocks = []
     flows = []
     parameters = []
 
-    for variable_name in minsky.variableValues.keys():
-        var = minsky.variableValues[variable_name]
+    for variable_name in model.variableValues.keys():
+        var = model.variableValues[variable_name]
         if var.type() == 'flow':
             flows.append(variable_name)
         elif var.type() == 'stock':
@@ -194,17 +255,17 @@ def show_minsky_variables():
 
 
 
-def create_figures():
+def create_figures(figs):
     # Create initial figures for all charts with proper layout
     figures = {}
-    
+
     for fig_config in figs:
         fig = go.Figure()
-        
+
         # Add traces
         for trace in fig_config["traces"]:
             fig.add_trace(go.Scatter(x=[], y=[], name=r'$' + trace["name"] + '$'))
-        
+
         # Update layout
         fig.update_layout(
             title=fig_config["title"],
@@ -231,13 +292,11 @@ def create_figures():
             ),
             template='plotly'
         )
-        
+
         # Store figure with its graph_id
         figures[fig_config["graph_id"]] = fig
-    
-    return figures
 
-figures = create_figures()
+    return figures
 
 
 # Markdown text components
@@ -263,468 +322,643 @@ learn_text = dcc.Markdown(
     """
 )
 
-# Create cards for different sections
-simulation_card = dbc.Card(simulation_text, className="mt-2")
-learn_card = dbc.Card(
-    [
-        dbc.CardHeader("Understanding the Minsky Model"),
-        dbc.CardBody(learn_text),
-    ],
-    className="mt-4",
-)
 
-# Create tabs
-tabs = dbc.Tabs(
-    [
-        dbc.Tab(learn_card, tab_id="tab1", label="Learn"),
-        dbc.Tab(
-            [
-                simulation_card,
-                html.Div([
+def create_app(config_file='config.json', url_base_pathname='/', scenarios_url=None):
+    """
+    Create a dashboard for the model and figures described by a config file.
+
+    Each dashboard has its own model pool, and each browser session its own model,
+    simulation thread and frame channel, so several dashboards can be mounted in one
+    FastAPI process (see dashboards.json and main.py) and visitors do not share a run.
+
+    Args:
+        config_file (str): Path of the dashboard's config (figs, sliders and settings)
+        url_base_pathname (str): Path the dashboard is served under, e.g. '/' or '/bomd/'
+        scenarios_url (str): URL of the static scenario bundles (see build_scenarios.py), linked
+            from the dashboard and used for visitors refused a session. None if not served.
+
+    Returns:
+        Dash: The dashboard application
+    """
+    figs, sliders, settings = load_config(config_file)
+    traces = make_traces(figs)
+
+    print([(trace["name"], trace["id"]) for sublist in traces for trace in sublist])
+
+    # Frame channel for simulation results, see config.json settings.frame_channel
+    channel_config = settings.get('frame_channel', {})
+
+    def make_channel():
+        return FrameChannel(
+            1 + sum(len(sublist) for sublist in traces),
+            capacity=channel_config.get('capacity', 5),
+            policy=channel_config.get('policy', 'drop-oldest'),
+            block_timeout=channel_config.get('block_timeout'),
+        )
+
+    # Wire encoding of figure updates, see config.json settings.wire
+    wire = load_wire_settings(settings)
+    precisions = [[trace.get("precision", wire["precision"]) for trace in sublist] for sublist in traces]
+    wire_stats = WireStats(wire["encoding"], wire["stats_every"])
+
+    # Minsky models come from a pool of pre-loaded, pre-reset models
+    model_file = settings.get('model_file', "BOMDwithGovernmentLive.mky")
+    model_pool = ModelPool(model_file, size=settings.get('model_pool', {}).get('size', 2))
+    solver_profiles, default_profile = load_solver_profiles(settings)
+
+    # Initial slider values and integrator settings are the model's defaults
+    model = model_pool.acquire()
+    slider_values = {
+        slider["id"]: get_minsky_var(model, slider["minsky_var"]) * slider["multiplier"] if slider["minsky_var"] else slider["value"]
+        for slider in sliders
+    }
+    solver_profiles = complete_solver_profiles(solver_profiles, solver_defaults(model))
+    model_pool.release(model)
+
+    # Every browser session runs its own model, simulation thread and frame channel,
+    # see config.json settings.sessions
+    def create_session(session_state):
+        profile = solver_profiles.get(session_state.get('solver_profile'), solver_profiles[default_profile])
+        model = prepare_model(model_pool.acquire(), profile)
+        model.running(session_state.get('is_running', True))
+        sim_thread = SimulationThread(model, figs, traces, make_channel())
+        sim_thread.start()
+        return sim_thread
+
+    def close_session(sim_thread):
+        sim_thread.stop()
+        sim_thread.join(5)
+        if sim_thread.is_alive():
+            # The worker is stuck in a request, kill it rather than holding up the reaper
+            print("Simulation thread did not stop, killing its model")
+            sim_thread.model.kill()
+        model_pool.release(sim_thread.model)
+
+    session_config = settings.get('sessions', {})
+    sessions = SessionRegistry(
+        create_session,
+        close_session,
+        idle_timeout=session_config.get('idle_timeout', 600),
+        max_sessions=session_config.get('max_sessions', 20),
+        evict_after=session_config.get('evict_after', 60),
+    )
+
+    def get_session(session_state):
+        # A session refused because all are in use is sent elsewhere by update_latest_values
+        try:
+            return sessions.get(session_state.get('session_id', 'default'), session_state)
+        except SessionLimitError:
+            raise PreventUpdate
+
+    # Create the Dash application with the correct configuration
+    app = Dash(
+        __name__,
+        external_stylesheets=[
+            dbc.themes.SPACELAB,
+            dbc.icons.FONT_AWESOME,
+        ],
+        requests_pathname_prefix=url_base_pathname,
+        # assets_folder='static',
+        # assets_url_path='/static'
+    )
+
+    figures = create_figures(figs)
+    graphs = [dcc.Graph(figure=fig, id=graph_id, mathjax=True) for graph_id, fig in figures.items()]
+    half = (len(graphs) + 1) // 2
+
+    # Create cards for different sections
+    simulation_card = dbc.Card(simulation_text, className="mt-2")
+    learn_card = dbc.Card(
+        [
+            dbc.CardHeader("Understanding the Minsky Model"),
+            dbc.CardBody(learn_text),
+        ],
+        className="mt-4",
+    )
+
+    # Create tabs
+    tabs = dbc.Tabs(
+        [
+            dbc.Tab(learn_card, tab_id="tab1", label="Learn"),
+            dbc.Tab(
+                [
+                    simulation_card,
                     html.Div([
-                        html.Button(
-                            html.I(className="fas fa-play"),
-                            id="play-pause-button",
-                            className="btn btn-primary me-2"
-                        ),
-                        html.Button(
-                            html.I(className="fas fa-redo"),
-                            id="rerun-button",
-                            className="btn btn-warning"
-                        ),
-                    ], className="mb-3"),
-                    *[
                         html.Div([
-                            html.Label(slider["label"], className="mt-3"),
-                            dcc.Slider(
-                                id=slider["id"],
-                                min=slider["min"],
-                                max=slider["max"],
-                                step=slider["step"],
-                                value=get_minsky_var(slider["minsky_var"]) * slider["multiplier"] if slider["minsky_var"] else slider["value"],
-                                marks=slider["marks"],
-                                tooltip={"placement": "bottom", "always_visible": True}
+                            html.Button(
+                                html.I(className="fas fa-play"),
+                                id="play-pause-button",
+                                className="btn btn-primary me-2"
                             ),
-                        ]) for slider in sliders
-                    ]
-                ]),
-            ],
-            tab_id="tab-2",
-            label="Simulate",
-            className="pb-4",
-        ),
-    ],
-    id="tabs",
-    active_tab="tab-2",
-    className="mt-2",
-)
-
-# Main layout
-app.layout = dbc.Container(
-    [
-        dbc.Row(
-            dbc.Col(
-                html.H2(
-                    "Minsky Economic Model Simulation",
-                    className="text-center bg-primary text-white p-2",
-                ),
-            )
-        ),
-        dbc.Row(
+                            html.Button(
+                                html.I(className="fas fa-redo"),
+                                id="rerun-button",
+                                className="btn btn-warning"
+                            ),
+                        ], className="mb-3"),
+                        *([
+                            html.P([
+                                "Just watching? ",
+                                html.A("Browse the precomputed scenarios", href=scenarios_url),
+                                ", they do not need a live simulation.",
+                            ], className="text-muted"),
+                        ] if scenarios_url else []),
+                        html.Div([
+                            html.Label("Solver Profile", className="mt-3"),
+                            dcc.Dropdown(
+                                id="solver-profile",
+                                options=[{"label": name.capitalize(), "value": name} for name in solver_profiles],
+                                value=default_profile,
+                                clearable=False,
+                                persistence=True,
+                                persistence_type='session',
+                            ),
+                            html.Small("Takes effect on the next rerun.", className="text-muted"),
+                        ]),
+                        *[
+                            html.Div([
+                                html.Label(slider["label"], className="mt-3"),
+                                dcc.Slider(
+                                    id=slider["id"],
+                                    min=slider["min"],
+                                    max=slider["max"],
+                                    step=slider["step"],
+                                    value=slider_values[slider["id"]],
+                                    marks=slider["marks"],
+                                    tooltip={"placement": "bottom", "always_visible": True}
+                                ),
+                            ]) for slider in sliders
+                        ]
+                    ]),
+                ],
+                tab_id="tab-2",
+                label="Simulate",
+                className="pb-4",
+            ),
+        ],
+        id="tabs",
+        active_tab="tab-2",
+        className="mt-2",
+    )
+
+    # Main layout, served per page load so every new tab gets its own session id
+    # (the session storage of session-state keeps it across reloads of the tab)
+    def serve_layout():
+        return dbc.Container(
             [
-                html.Div(
-                    [
-                        html.Button(
-                            html.I(className="fas fa-chevron-left"),
-                            id="toggle-sidebar",
-                            className="btn btn-primary",
-                            style={
-                                "width": "40px", 
-                                "height": "40px",
-                                "position": "absolute",
-                                "left": "0px",
-                                "top": "0px",
-                                "z-index": "1000"
-                            }
+                dbc.Row(
+                    dbc.Col(
+                        html.H2(
+                            "Minsky Economic Model Simulation",
+                            className="text-center bg-primary text-white p-2",
                         ),
-                        dbc.Col(
-                            [
-                                tabs,
-                            ],
-                            id="sidebar-column",
-                            width={"size": 4, "order": 1},
-                            # xs=12,  # Full width on extra small screens
-                            className="mt-4 border",
-                            style={
-                                "maxHeight": "calc(100vh - 100px)",  # Set max height to viewport height minus some space for header
-                                "overflowY": "auto",  # Add vertical scrollbar when needed
-                                "padding": "10px"  # Add some padding
-                            }
-                        ),
-                        dbc.Col(
+                    )
+                ),
+                dbc.Row(
+                    [
+                        html.Div(
                             [
-                                dbc.Tabs(
+                                html.Button(
+                                    html.I(className="fas fa-chevron-left"),
+                                    id="toggle-sidebar",
+                                    className="btn btn-primary",
+                                    style={
+                                        "width": "40px",
+                                        "height": "40px",
+                                        "position": "absolute",
+                                        "left": "0px",
+                                        "top": "0px",
+                                        "z-index": "1000"
+                                    }
+                                ),
+                                dbc.Col(
+                                    [
+                                        tabs,
+                                    ],
+                                    id="sidebar-column",
+                                    width={"size": 4, "order": 1},
+                                    # xs=12,  # Full width on extra small screens
+                                    className="mt-4 border",
+                                    style={
+                                        "maxHeight": "calc(100vh - 100px)",  # Set max height to viewport height minus some space for header
+                                        "overflowY": "auto",  # Add vertical scrollbar when needed
+                                        "padding": "10px"  # Add some padding
+                                    }
+                                ),
+                                dbc.Col(
                                     [
-                                        dbc.Tab(
+                                        dbc.Tabs(
                                             [
-                                                html.Div([
-                                                    dcc.Graph(figure=list(figures.items())[0][1], id=list(figures.items())[0][0], mathjax=True),
-                                                    dcc.Graph(figure=list(figures.items())[1][1], id=list(figures.items())[1][0], mathjax=True),
-                                                ], style={'width': '50%', 'display': 'inline-block'}),
-                                                html.Div([
-                                                    dcc.Graph(figure=list(figures.items())[2][1], id=list(figures.items())[2][0], mathjax=True),
-                                                    dcc.Graph(figure=list(figures.items())[3][1], id=list(figures.items())[3][0], mathjax=True),
-                                                ], style={'width': '50%', 'display': 'inline-block'}),
-                                            ],
-                                            label="All Plots",
-                                            tab_id="tab-plots-all",
-                                        ),
+                                                dbc.Tab(
+                                                    [
+                                                        html.Div(graphs[:half], style={'width': '50%', 'display': 'inline-block'}),
+                                                        html.Div(graphs[half:], style={'width': '50%', 'display': 'inline-block'}),
+                                                    ],
+                                                    label="All Plots",
+                                                    tab_id="tab-plots-all",
+                                                ),
 
-                                        dbc.Tab(
-                                            [
-                                                dbc.Table(
+                                                dbc.Tab(
                                                     [
-                                                        html.Thead(
-                                                            html.Tr([
-                                                                html.Th("Metric"),
-                                                                html.Th("Latest Value"),
-                                                            ])
+                                                        dbc.Table(
+                                                            [
+                                                                html.Thead(
+                                                                    html.Tr([
+                                                                        html.Th("Metric"),
+                                                                        html.Th("Latest Value"),
+                                                                    ])
+                                                                ),
+                                                                html.Tbody([
+                                                                    html.Tr([
+                                                                        html.Td("Simulation Time"),
+                                                                        html.Td(id="latest-time"),
+                                                                    ]),
+                                                                    *[html.Tr([
+                                                                        html.Td(trace["name"]),
+                                                                        html.Td(id=f"latest-{trace['id']}"),
+                                                                    ]) for sublist in traces for trace in sublist]
+                                                                ])
+                                                            ],
+                                                            bordered=True,
+                                                            hover=True,
+                                                            responsive=True,
+                                                            striped=True,
                                                         ),
-                                                        html.Tbody([
-                                                            html.Tr([
-                                                                html.Td("Simulation Time"),
-                                                                html.Td(id="latest-time"),
-                                                            ]),
-                                                            *[html.Tr([
-                                                                html.Td(trace["name"]),
-                                                                html.Td(id=f"latest-{trace['id']}"),
-                                                            ]) for sublist in traces for trace in sublist]
-                                                        ])
                                                     ],
-                                                    bordered=True,
-                                                    hover=True,
-                                                    responsive=True,
-                                                    striped=True,
+                                                    label="Latest Values",
+                                                    tab_id="tab-values",
                                                 ),
                                             ],
-                                            label="Latest Values",
-                                            tab_id="tab-values",
+                                            id="plots-tabs",
+                                            active_tab="tab-plots-all",
                                         ),
                                     ],
-                                    id="plots-tabs",
-                                    active_tab="tab-plots-all",
+                                    id="main-content",
+                                    width={"size": 8, "order": 2},
+                                    # xs=12,  # Full width on extra small screens
+                                    className="pt-4"
                                 ),
                             ],
-                            id="main-content",
-                            width={"size": 8, "order": 2},
-                            # xs=12,  # Full width on extra small screens
-                            className="pt-4"
+                            className="resizable-container",
+                            style={
+                                'display': 'flex',
+                                'position': 'relative',
+                            }
                         ),
                     ],
-                    className="resizable-container",
-                    style={
-                        'display': 'flex',
-                        'position': 'relative',
-                    }
+                    className="ms-1"
+                ),
+                dcc.Store(id='frame-batch'),
+                dcc.Store(id='latest-values'),
+                dcc.Location(id='redirect', refresh=True),
+                dcc.Store(id='session-state', storage_type='session', data={
+                    'session_id': uuid.uuid4().hex,
+                    'do_clear_figs': True,
+                    'is_running': True,
+                    'solver_profile': default_profile,
+                }),
+                dcc.Interval(
+                    id='interval-component',
+                    interval=500,  # in milliseconds
+                    n_intervals=0,
+                    disabled=False
                 ),
+                dcc.Interval(
+                    id='values-interval-component',
+                    interval=1000,  # 1 second in milliseconds
+                    n_intervals=0,
+                    disabled=False
+                )
             ],
-            className="ms-1"
-        ),
-        dcc.Store(id='session-state', storage_type='session', data={'do_clear_figs': True, 'is_running': True}),
-        dcc.Interval(
-            id='interval-component',
-            interval=500,  # in milliseconds
-            n_intervals=0,
-            disabled=False
-        ),
-        dcc.Interval(
-            id='values-interval-component',
-            interval=1000,  # 1 second in milliseconds
-            n_intervals=0,
-            disabled=False
+            fluid=True
         )
-    ],
-    fluid=True
-)
 
-@callback(
-    [Output("play-pause-button", "children"),
-     Output("play-pause-button", "className"),
-     Output("rerun-button", "disabled")],
-    Input("session-state", "data"),
-    prevent_initial_call=False
-)
-def set_initial_button_state(session_state):
-    if session_state.get('is_running', True):
-        return html.I(className="fas fa-pause"), "btn btn-primary me-2", True
-    else:
-        return html.I(className="fas fa-play"), "btn btn-primary me-2", False
-
-@callback(
-    [Output('session-state', 'data', allow_duplicate=True),
-     Output('interval-component', 'disabled', allow_duplicate=True),
-     Output("play-pause-button", "children", allow_duplicate=True),
-     Output("play-pause-button", "className", allow_duplicate=True),
-     Output("rerun-button", "disabled", allow_duplicate=True)],
-    [Input("rerun-button", "n_clicks"),
-     Input("play-pause-button", "n_clicks")],
-    [State('session-state', 'data'),
-     State("play-pause-button", "children")],
-    prevent_initial_call=True
-)
-def handle_control(n_clicks_rerun, n_clicks_play, session_state, current_icon):
-    ctx = callback_context
-    if not ctx.triggered:
-        return no_update, no_update, no_update, no_update, no_update
-    
-    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    print(f"Control triggered by {trigger_id}", session_state)
-    
-    if trigger_id == "rerun-button":
-        print("Rerun clicked")
-
-        # make a list current values of the policy variables
-        policy_vars = []
-        for slider in sliders:
-            if slider['minsky_var'] is not None:
-                policy_vars.append((slider['minsky_var'], get_minsky_var(slider['minsky_var'])))
-
-        minsky.reset()
-        minsky.running(False)
-        # set the minsky variables to the current values
-        print("Setting Policy Variables: ")
-        for var in policy_vars:
-            set_minsky_var(var[0], var[1])  
-
-        # Clear the simulation queue
-        while not simulation_queue.empty():
-            try:
-                simulation_queue.get_nowait()
-            except queue.Empty:
-                break
-
-        session_state['is_running'] = False
-        session_state['do_clear_figs'] = True
-        session_state['policy_change_times'] = []
-        print("Setting: ", session_state)
-        return session_state, False, html.I(className="fas fa-play"), "btn btn-primary me-2", False
-    
-    elif trigger_id == "play-pause-button":
-        print("Play/Pause clicked")
-        if current_icon is None or "fa-pause" in str(current_icon):
-            minsky.running(False)
-            session_state['is_running'] = False
-            return session_state, True, html.I(className="fas fa-play"), "btn btn-primary me-2", False
+    app.layout = serve_layout
+
+    @app.callback(
+        [Output("play-pause-button", "children"),
+         Output("play-pause-button", "className"),
+         Output("rerun-button", "disabled")],
+        Input("session-state", "data"),
+        prevent_initial_call=False
+    )
+    def set_initial_button_state(session_state):
+        if session_state.get('is_running', True):
+            return html.I(className="fas fa-pause"), "btn btn-primary me-2", True
         else:
-            minsky.running(True)
-            session_state['is_running'] = True
-            session_state['do_clear_figs'] = False
-            return session_state, False, html.I(className="fas fa-pause"), "btn btn-primary me-2", True
-
-
+            return html.I(className="fas fa-play"), "btn btn-primary me-2", False
+
+    @app.callback(
+        [Output('session-state', 'data', allow_duplicate=True),
+         Output('interval-component', 'disabled', allow_duplicate=True),
+         Output("play-pause-button", "children", allow_duplicate=True),
+         Output("play-pause-button", "className", allow_duplicate=True),
+         Output("rerun-button", "disabled", allow_duplicate=True)],
+        [Input("rerun-button", "n_clicks"),
+         Input("play-pause-button", "n_clicks")],
+        [State('session-state', 'data'),
+         State("play-pause-button", "children")],
+        prevent_initial_call=True
+    )
+    def handle_control(n_clicks_rerun, n_clicks_play, session_state, current_icon):
+        ctx = callback_context
+        if not ctx.triggered:
+            return no_update, no_update, no_update, no_update, no_update
+
+        trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+        print(f"Control triggered by {trigger_id}", session_state)
+
+        sim_thread = get_session(session_state)
+
+        if trigger_id == "rerun-button":
+            print("Rerun clicked")
+
+            # make a list current values of the policy variables
+            policy_vars = []
+            with sim_thread.lock:
+                for slider in sliders:
+                    if slider['minsky_var'] is not None:
+                        policy_vars.append((slider['minsky_var'], get_minsky_var(sim_thread.model, slider['minsky_var'])))
+
+            # Take a fresh model from the pool instead of resetting the current one
+            profile = solver_profiles.get(session_state.get('solver_profile'), solver_profiles[default_profile])
+            new_model = prepare_model(model_pool.acquire(), profile)
+            new_model.running(False)
+            # set the minsky variables to the current values
+            print("Setting Policy Variables: ")
+            for var in policy_vars:
+                set_minsky_var(new_model, var[0], var[1])
+
+            # Swap in the new model with an empty frame channel
+            model_pool.release(sim_thread.swap_model(new_model, make_channel()))
 
+            session_state['is_running'] = False
+            session_state['do_clear_figs'] = True
+            session_state['policy_change_times'] = []
+            print("Setting: ", session_state)
+            return session_state, False, html.I(className="fas fa-play"), "btn btn-primary me-2", False
+
+        elif trigger_id == "play-pause-button":
+            print("Play/Pause clicked")
+            if current_icon is None or "fa-pause" in str(current_icon):
+                with sim_thread.lock:
+                    sim_thread.model.running(False)
+                session_state['is_running'] = False
+                return session_state, True, html.I(className="fas fa-play"), "btn btn-primary me-2", False
+            else:
+                with sim_thread.lock:
+                    sim_thread.model.running(True)
+                session_state['is_running'] = True
+                session_state['do_clear_figs'] = False
+                return session_state, False, html.I(className="fas fa-pause"), "btn btn-primary me-2", True
+
+
+
+
+    @app.callback(
+        [Output(fig_config["graph_id"], 'figure', allow_duplicate=True) for fig_config in figs] +
+        [Output('frame-batch', 'data'),
+         Output('interval-component', 'disabled', allow_duplicate=True)],
+        [Input("interval-component", "n_intervals")],
+        [State('session-state', 'data')],
+        prevent_initial_call=True,
+    )
+    def update_graphs(n_intervals, session_state):
+        ctx = callback_context
+        if not ctx.triggered:
+            print('ctx not triggered')
+            return [no_update for _ in figs] + [no_update, False]
+
+        trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+
+        # Handle clearing
+        if session_state.get('do_clear_figs', True):
+            print("Clearing figures", session_state)
+            session_state['do_clear_figs'] = False
+            patches = []
+            for fig_config in figs:
+                patched_fig = Patch()
+                for i in range(len(fig_config["traces"])):
+                    patched_fig["data"][i]["x"] = []
+                    patched_fig["data"][i]["y"] = []
+                patches.append(patched_fig)
+
+            return patches + [no_update, True]
+
+
+        # Check if model is running
+        sim_thread = get_session(session_state)
+        with sim_thread.lock:
+            running = sim_thread.model.running()
+        if running and session_state.get('is_running', True):
+            # Get the latest batch of simulation results from queue
+            frames = sim_thread.simulation_queue.drain(wire["batch"])
+
+            if frames:
+                if wire["encoding"] == COMPACT:
+                    # One compact batch for all figures, decoded in the browser
+                    batch = encode_frames(frames, traces, sim_thread.trace_offsets, precisions, wire["time_precision"])
+                    wire_stats.record(batch, len(frames))
+                    return [no_update for _ in figs] + [batch, False]
 
-@callback(
-    [Output(fig_config["graph_id"], 'figure', allow_duplicate=True) for fig_config in figs] + 
-    [Output('interval-component', 'disabled', allow_duplicate=True)],
-    [Input("interval-component", "n_intervals")],
-    [State('session-state', 'data')],
-    prevent_initial_call=True,
-)
-def update_graphs(n_intervals, session_state):
-    ctx = callback_context
-    if not ctx.triggered:
-        print('ctx not triggered')
-        return [no_update for _ in figs] + [False]    
-
-    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    
-    # Handle clearing
-    if session_state.get('do_clear_figs', True):
-        print("Clearing figures", session_state)
-        session_state['do_clear_figs'] = False
-        patches = []
-        for fig_config in figs:
-            patched_fig = Patch()
-            for i in range(len(fig_config["traces"])):
-                patched_fig["data"][i]["x"] = []
-                patched_fig["data"][i]["y"] = []
-            patches.append(patched_fig)
-
-        return patches + [True]
-
-    
-    # Check if model is running
-    if minsky.running() and session_state.get('is_running', True):
-        results = None
-        try:
-            # Get latest simulation results from queue
-            while not simulation_queue.empty():
-                results = simulation_queue.get_nowait()
-            
-            if results:
-                # print("Results: ", results)
                 # Create patches for all figures
-                patches = []
-                sim_time = results[0][0]
-
-                for i, graph in enumerate(results[1:]):
-                    patched_fig = Patch()
-                    for j, value in enumerate(graph):
-                        patched_fig["data"][j]["x"].append(sim_time)
-                        patched_fig["data"][j]["y"].append(value)
-                    patches.append(patched_fig)
-
-                return patches + [False]
+                patches = patch_frames(frames, traces, sim_thread.trace_offsets, precisions, wire["time_precision"])
+                wire_stats.record(patches, len(frames))
+                return patches + [no_update, False]
             else:
                 print("No results in queue")
-                return [no_update for _ in figs] + [False]
-        except queue.Empty:
-            print("No results in queue")
-            pass
-    print('paused')
-    return [no_update for _ in figs] + [True]
-
-
-## Slider callbacks
-
-@callback(
-    Output("interval-component", "interval"),
-    Input("update-interval", "value")
-)
-def update_interval(value):
-    return value
-
-# Generate callbacks for each Minsky variable slider
-for slider in sliders:
-    if slider['minsky_var'] is not None:
-        callback(
-            Output(slider['id'], "value"),
-            Input(slider['id'], "value")
-        )(lambda value, slider=slider: (
-            set_minsky_var(slider['minsky_var'], value / (100 if slider['units'] == "%" else 1)) if value is not None else None,
-            value
-        )[1])
-
-@callback(
-    [Output("sidebar-column", "style"),        # First return value: {"display": "block"}
-     Output("toggle-sidebar", "children"),      # Second return value: html.I(className="fas fa-chevron-left")
-     Output("sidebar-column", "width"),         # Third return value: 5
-     Output("main-content", "width")],          # Fourth return value: 7
-    Input("toggle-sidebar", "n_clicks"),
-    State("sidebar-column", "style"),
-    prevent_initial_call=True
-)
-def toggle_sidebar(n_clicks, current_style):
-    if current_style is None:
-        current_style = {"display": "block"}
-    
-    if current_style.get("display") == "none":
-        return {"display": "block"}, html.I(className="fas fa-chevron-left"), 4, 8
-    else:
-        return {"display": "none"}, html.I(className="fas fa-chevron-right"), 0, 12
+                return [no_update for _ in figs] + [no_update, False]
+        print('paused')
+        return [no_update for _ in figs] + [no_update, True]
+
+    # Append compact batches from update_graphs to the figures in the browser
+    app.clientside_callback(
+        DECODE_BATCH_JS,
+        [Output(fig_config["graph_id"], 'figure', allow_duplicate=True) for fig_config in figs],
+        Input('frame-batch', 'data'),
+        [State(fig_config["graph_id"], 'figure') for fig_config in figs],
+        prevent_initial_call=True,
+    )
+
+
+    @app.callback(
+        Output('session-state', 'data', allow_duplicate=True),
+        Input("solver-profile", "value"),
+        State('session-state', 'data'),
+        prevent_initial_call=True
+    )
+    def set_solver_profile(profile_name, session_state):
+        # Keep the profile for the next rerun, applying it needs a reset of the model
+        print("Solver profile: ", profile_name, solver_profiles[profile_name])
+        session_state['solver_profile'] = profile_name
+        return session_state
+
+
+    ## Slider callbacks
+
+    @app.callback(
+        Output("interval-component", "interval"),
+        Input("update-interval", "value")
+    )
+    def update_interval(value):
+        return value
+
+    # Generate callbacks for each Minsky variable slider
+    def make_slider_callback(slider):
+        def set_slider_var(value, session_state):
+            if value is not None:
+                sim_thread = get_session(session_state)
+                with sim_thread.lock:
+                    set_minsky_var(sim_thread.model, slider['minsky_var'], value / (100 if slider['units'] == "%" else 1))
+            return value
+        return set_slider_var
+
+    for slider in sliders:
+        if slider['minsky_var'] is not None:
+            app.callback(
+                Output(slider['id'], "value"),
+                Input(slider['id'], "value"),
+                State('session-state', 'data')
+            )(make_slider_callback(slider))
+
+    @app.callback(
+        [Output("sidebar-column", "style"),        # First return value: {"display": "block"}
+         Output("toggle-sidebar", "children"),      # Second return value: html.I(className="fas fa-chevron-left")
+         Output("sidebar-column", "width"),         # Third return value: 5
+         Output("main-content", "width")],          # Fourth return value: 7
+        Input("toggle-sidebar", "n_clicks"),
+        State("sidebar-column", "style"),
+        prevent_initial_call=True
+    )
+    def toggle_sidebar(n_clicks, current_style):
+        if current_style is None:
+            current_style = {"display": "block"}
+
+        if current_style.get("display") == "none":
+            return {"display": "block"}, html.I(className="fas fa-chevron-left"), 4, 8
+        else:
+            return {"display": "none"}, html.I(className="fas fa-chevron-right"), 0, 12
 
 
 
-@callback(
-    [Output("latest-time", "children"),
-     *[Output(f"latest-{trace['id']}", "children") for sublist in traces for trace in sublist]],
-    [Input("values-interval-component", "n_intervals")],
-    prevent_initial_call=True,
-)
-def update_latest_values(n_intervals):
-    results = sim_thread.get_results(flatten=True)
-    # names = sim_thread.get_trace_names(flatten=True)
-    txt = []
-    for i, value in enumerate(results):
-        # print(names[i], value)
-        txt.append(f"{value:.2f}")
-    return txt
-
-    # # for debugging
-    # int_rate = minsky.variableValues[":Interest_{Rate}"].value()
-    # lend_frac = minsky.variableValues[":Lend_{Frac}"].value()
-    # spend_frac = minsky.variableValues[":Spend_{Frac}"].value()
-    # print("Interest Rate: ", int_rate, "Lend Fraction: ", lend_frac, "Spend Fraction: ", spend_frac)
-    # return sim_time, gdp, gov_debt, priv_debt, money, savers, borrowers, banks, gov_int, priv_int, gdp_inc
-
-
-@app.callback(
-    [Output(fig_config["graph_id"], 'figure', allow_duplicate=True) for fig_config in figs] + 
-    [Output('session-state', 'data', allow_duplicate=True)],
-    [Input(slider["id"], "value") for slider in sliders if slider["minsky_var"] is not None],
-    [Input("rerun-button", "n_clicks")],
-    [State('session-state', 'data')],
-    prevent_initial_call=True
-)
-def update_policy_lines(*args):
-    # Get the triggering input
-    ctx = callback_context
-    if not ctx.triggered:
-        return no_update, no_update, no_update, no_update, session_state
-    
-    # Get slider values and session state
-    slider_values = args[:-2]  # All args except last two (rerun_n_clicks and session_state)
-    rerun_n_clicks = args[-2]
-    session_state = args[-1]
-    
-    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    print("Trigger ID: update_policy_lines: ", trigger_id)
-    
-    # Clear policy change times if simulation is reset
-    if trigger_id == 'rerun-button' :
-        print("Clearing policy change times", session_state, "rerun_n_clicks", rerun_n_clicks)
-        session_state['policy_change_times'] = []
-        patched_policy = Patch()
-        patched_policy['layout']['shapes'] = []
-        return patched_policy, patched_policy, patched_policy, patched_policy,  session_state
-    
-    # Create patches for all figures
-    patched = Patch()
-
-    
-    # Get current simulation time
-    current_time = minsky.t()
-    
-    # Add shapes based on trigger type
-    shapes = []
-    
-    # Add policy change line if triggered by slider ( ie not session state)
-    if trigger_id != 'session-state':
-        # Add current time to history
-        if 'policy_change_times' not in session_state:
+    @app.callback(
+        [Output('latest-values', 'data'),
+         Output('redirect', 'href')],
+        [Input("values-interval-component", "n_intervals")],
+        [State('session-state', 'data')],
+        prevent_initial_call=True,
+    )
+    def update_latest_values(n_intervals, session_state):
+        try:
+            sim_thread = sessions.get(session_state.get('session_id', 'default'), session_state)
+        except SessionLimitError:
+            # All sessions are in use, send the visitor to the precomputed scenarios
+            if scenarios_url is None:
+                raise PreventUpdate
+            return no_update, scenarios_url
+        # One rounded list for the whole table, formatted in the browser
+        return encode_latest(sim_thread.get_results(flatten=True)), no_update
+
+    app.clientside_callback(
+        FORMAT_LATEST_JS,
+        [Output("latest-time", "children"),
+         *[Output(f"latest-{trace['id']}", "children") for sublist in traces for trace in sublist]],
+        Input('latest-values', 'data'),
+        prevent_initial_call=True,
+    )
+
+
+    @app.callback(
+        [Output(fig_config["graph_id"], 'figure', allow_duplicate=True) for fig_config in figs] +
+        [Output('session-state', 'data', allow_duplicate=True)],
+        [Input(slider["id"], "value") for slider in sliders if slider["minsky_var"] is not None],
+        [Input("rerun-button", "n_clicks")],
+        [State('session-state', 'data')],
+        prevent_initial_call=True
+    )
+    def update_policy_lines(*args):
+        # Get the triggering input
+        ctx = callback_context
+        if not ctx.triggered:
+            return [no_update for _ in figs] + [no_update]
+
+        # Get slider values and session state
+        slider_values = args[:-2]  # All args except last two (rerun_n_clicks and session_state)
+        rerun_n_clicks = args[-2]
+        session_state = args[-1]
+
+        trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+        print("Trigger ID: update_policy_lines: ", trigger_id)
+
+        # Clear policy change times if simulation is reset
+        if trigger_id == 'rerun-button' :
+            print("Clearing policy change times", session_state, "rerun_n_clicks", rerun_n_clicks)
             session_state['policy_change_times'] = []
-        session_state['policy_change_times'].append(current_time)
-    
-    # Always add lines for all policy changes, regardless of trigger
-    if 'policy_change_times' in session_state:
-        print("Adding lines for all policy changes")
-        for time in session_state['policy_change_times']:
-            shapes.append({
-                'type': 'line',
-                'x0': time,
-                'x1': time,
-                'y0': 0,
-                'y1': 1,
-                'yref': 'paper',
-                'line': {'color': 'gray', 'dash': 'dot', 'width': 1}
-            })
-    
-    # Update all figures with the shapes
-    patched['layout']['shapes'] = shapes
-    return [patched for _ in figs] + [session_state]
-
-@app.server.route('/test')
-def test_route():
-    return "Test route is working"
+            patched_policy = Patch()
+            patched_policy['layout']['shapes'] = []
+            return [patched_policy for _ in figs] + [session_state]
+
+        # Create patches for all figures
+        patched = Patch()
+
+
+        # Get current simulation time
+        sim_thread = get_session(session_state)
+        with sim_thread.lock:
+            current_time = sim_thread.model.t()
+
+        # Add shapes based on trigger type
+        shapes = []
+
+        # Add policy change line if triggered by slider ( ie not session state)
+        if trigger_id != 'session-state':
+            # Add current time to history
+            if 'policy_change_times' not in session_state:
+                session_state['policy_change_times'] = []
+            session_state['policy_change_times'].append(current_time)
+
+        # Always add lines for all policy changes, regardless of trigger
+        if 'policy_change_times' in session_state:
+            print("Adding lines for all policy changes")
+            for time in session_state['policy_change_times']:
+                shapes.append({
+                    'type': 'line',
+                    'x0': time,
+                    'x1': time,
+                    'y0': 0,
+                    'y1': 1,
+                    'yref': 'paper',
+                    'line': {'color': 'gray', 'dash': 'dot', 'width': 1}
+                })
+
+        # Update all figures with the shapes
+        patched['layout']['shapes'] = shapes
+        return [patched for _ in figs] + [session_state]
+
+    @app.server.route('/test')
+    def test_route():
+        return "Test route is working"
+
+    @app.server.route('/stats')
+    def stats_route():
+        # Frame channel counters (drops, coalesced frames, depth) per session, model pool usage and figure update payload sizes
+        return jsonify({
+            'sessions': sessions.stats(),
+            'frame_channels': [sim_thread.simulation_queue.stats() for sim_thread in sessions.sessions()],
+            'model_pool': model_pool.stats(),
+            'wire': wire_stats.stats(),
+        })
+
+    return app
 
 
 
 if __name__ == "__main__":
 
+    app = create_app()
     app.run(
         debug=False,  # Disable debug mode in production
         host='0.0.0.0',  # Bind to all interfaces
         # port=8050,
         extra_files=extra_files
-    )
\ No newline at end of file
+    )
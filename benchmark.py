@@ -0,0 +1,146 @@
+"""
+Integrator accuracy-vs-speed benchmark.
+
+Runs the dashboard's model headlessly across integrator orders, implicit/explicit
+integration and maximum step sizes, plus each named solver profile in the config, and
+reports steps/sec against the error relative to a high-accuracy reference trajectory on
+the configured traces. Use the results to tune settings.solver_profiles in config.json.
+
+    python benchmark.py --config config.json --t-end 50 --json bench.json
+"""
+import argparse
+import itertools
+import json
+
+from app_dash1 import load_config, make_traces, translate_minsky_var, load_solver_profiles, prepare_model
+from model_pool import RemoteMinsky
+
+
+def interpolate(trajectory, t, column, start=0):
+    """
+    Linearly interpolate one column of a trajectory at time t.
+
+    Args:
+        trajectory (list): Rows of [t, values...] in increasing time order
+        t (float): Time to interpolate at
+        column (int): Column of the value to interpolate
+        start (int): Row to start searching from
+
+    Returns:
+        tuple: (interpolated value, row index to start the next search from)
+    """
+    i = start
+    while i + 1 < len(trajectory) and trajectory[i + 1][0] < t:
+        i += 1
+    if i + 1 == len(trajectory):
+        return trajectory[i][column], i
+    t0, t1 = trajectory[i][0], trajectory[i + 1][0]
+    v0, v1 = trajectory[i][column], trajectory[i + 1][column]
+    if t1 == t0:
+        return v1, i
+    return v0 + (v1 - v0) * (t - t0) / (t1 - t0), i
+
+
+def trajectory_error(trajectory, reference, names):
+    """
+    Maximum error of each trace relative to the reference, scaled by the reference's largest magnitude.
+
+    Returns:
+        dict: Trace name to relative error
+    """
+    t_end = min(trajectory[-1][0], reference[-1][0])
+    errors = {}
+    for column, name in enumerate(names, start=1):
+        scale = max(abs(row[column]) for row in reference) or 1.0
+        error = 0.0
+        i = 0
+        for row in reference:
+            if row[0] < trajectory[0][0] or row[0] > t_end:
+                continue
+            value, i = interpolate(trajectory, row[0], column, i)
+            error = max(error, abs(value - row[column]) / scale)
+        errors[name] = error
+    return errors
+
+
+def run_profile(model_file, profile, names, t_end, max_steps):
+    # Each run gets a freshly loaded model so no state leaks between profiles
+    model = RemoteMinsky(model_file)
+    try:
+        prepare_model(model, profile)
+        return model.run_until(t_end, names, max_steps)
+    finally:
+        model.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Integrator accuracy-vs-speed benchmark")
+    parser.add_argument("--config", default="config.json", help="Dashboard config with the model file and traces")
+    parser.add_argument("--t-end", type=float, default=50, help="Simulation time to run each profile to")
+    parser.add_argument("--max-steps", type=int, default=1000000, help="Step limit for each run")
+    parser.add_argument("--orders", type=int, nargs="+", default=[1, 2, 4], help="Integrator orders to try")
+    parser.add_argument("--implicit", type=int, nargs="+", default=[0, 1], help="Implicit settings to try (0 or 1)")
+    parser.add_argument("--step-max", type=float, nargs="+", default=None,
+                        help="Maximum step sizes to try (default: the model's own stepMax x 0.25, 1 and 4)")
+    parser.add_argument("--reference", default='{"order": 4, "implicit": 0, "epsAbs": 1e-10, "epsRel": 1e-10}',
+                        help="JSON integrator settings for the reference trajectory (stepMax defaults to a tenth of the smallest tried)")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    figs, sliders, settings = load_config(args.config)
+    model_file = settings.get('model_file', "BOMDwithGovernmentLive.mky")
+    solver_profiles, default_profile = load_solver_profiles(settings)
+    traces = [trace for sublist in make_traces(figs) for trace in sublist]
+    names = [translate_minsky_var(trace["variable"], to_latex=False) for trace in traces]
+
+    step_max = args.step_max
+    if step_max is None:
+        model = RemoteMinsky(model_file)
+        default_step = model.stepMax()
+        model.close()
+        step_max = [default_step * 0.25, default_step, default_step * 4]
+
+    reference_profile = json.loads(args.reference)
+    reference_profile.setdefault("stepMax", min(step_max) / 10)
+    print(f"Reference run {reference_profile} to t={args.t_end}")
+    _, reference_time, reference = run_profile(model_file, reference_profile, names, args.t_end, args.max_steps)
+    print(f"Reference took {reference_time:.2f}s for {len(reference)} steps")
+
+    runs = [(f"order={order} implicit={implicit} stepMax={step:g}", {"order": order, "implicit": implicit, "stepMax": step})
+            for order, implicit, step in itertools.product(args.orders, args.implicit, step_max)]
+    runs += [(f"profile {name}", profile) for name, profile in solver_profiles.items()]
+
+    results = []
+    print(f"{'run':<44}{'steps':>9}{'steps/s':>12}{'sim t/s':>12}{'max error':>12}  worst trace")
+    for label, profile in runs:
+        try:
+            steps, elapsed, trajectory = run_profile(model_file, profile, names, args.t_end, args.max_steps)
+        except RuntimeError as e:
+            print(f"{label:<44}failed: {e}")
+            results.append({"run": label, "profile": profile, "error": str(e)})
+            continue
+        errors = trajectory_error(trajectory, reference, names) if trajectory else {}
+        worst = max(errors, key=errors.get) if errors else None
+        result = {
+            "run": label,
+            "profile": profile,
+            "steps": steps,
+            "seconds": elapsed,
+            "steps_per_sec": steps / elapsed if elapsed else None,
+            "sim_time_per_sec": trajectory[-1][0] / elapsed if elapsed and trajectory else None,
+            "max_error": errors[worst] if worst else None,
+            "worst_trace": translate_minsky_var(worst) if worst else None,
+            "errors": {translate_minsky_var(name): error for name, error in errors.items()},
+        }
+        results.append(result)
+        print(f"{label:<44}{steps:>9}{result['steps_per_sec'] or 0:>12.0f}{result['sim_time_per_sec'] or 0:>12.2f}"
+              f"{result['max_error'] if worst else float('nan'):>12.2e}  {result['worst_trace']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"model_file": model_file, "t_end": args.t_end, "reference": reference_profile, "results": results}, f, indent=4)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
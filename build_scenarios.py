@@ -0,0 +1,288 @@
+"""
+Build static scenario bundles.
+
+Runs the default scenario and every named policy preset in the sliders config headlessly,
+and writes a self-contained player page per scenario with the precomputed series, using the
+same figure layout as the dashboard. The output directory can be served from disk (see
+"scenarios" in dashboards.json) or uploaded to a CDN, so visitors who only watch these
+scenarios do not need a live simulation.
+
+    python build_scenarios.py --config config.json --out scenarios --t-end 100
+"""
+import argparse
+import html
+import json
+import os
+
+import dash_bootstrap_components as dbc
+from plotly.offline import get_plotlyjs
+
+from app_dash1 import load_config, make_traces, translate_minsky_var, load_solver_profiles, prepare_model, set_minsky_var, create_figures
+from model_pool import RemoteMinsky
+from wire import load_wire_settings, quantize
+
+MATHJAX_URL = "https://cdnjs.cloudflare.com/ajax/libs/mathjax/2.7.7/MathJax.js?config=TeX-AMS-MML_SVG"
+
+
+def load_scenarios(sliders):
+    """
+    Collect the default scenario and the named policy presets of the sliders.
+
+    A slider's "presets" maps a scenario name to the slider value (in slider units) for
+    that scenario. Sliders without a value for a scenario keep the model's default.
+
+    Args:
+        sliders (list): The sliders section of config.json
+
+    Returns:
+        dict: Scenario name to {slider id: value}, starting with "default"
+    """
+    scenarios = {"default": {}}
+    for slider in sliders:
+        if slider["minsky_var"] is None:
+            continue
+        for name, value in slider.get("presets", {}).items():
+            scenarios.setdefault(name, {})[slider["id"]] = value
+    return scenarios
+
+
+def scenario_label(name):
+    return name.replace('-', ' ').replace('_', ' ').capitalize()
+
+
+def run_scenario(model_file, profile, sliders, values, traces, t_end, points, precisions, time_precision):
+    """
+    Run one scenario and return its series, decimated to at most points per trace.
+
+    Returns:
+        dict: {"t": times, "y": [figure][trace] values}
+    """
+    # prepare_model resets the model so the profile applies, set the presets after that
+    model = prepare_model(RemoteMinsky(model_file), profile)
+    try:
+        # Same conversion as the dashboard's slider callbacks
+        for slider in sliders:
+            if slider["id"] in values:
+                set_minsky_var(model, slider["minsky_var"], values[slider["id"]] / (100 if slider["units"] == "%" else 1))
+        names = [translate_minsky_var(trace["variable"], to_latex=False) for sublist in traces for trace in sublist]
+        # run_until only records the state after each step, so start with the initial state
+        initial = model.read(names)
+        steps, elapsed, trajectory = model.run_until(t_end, names)
+        trajectory.insert(0, initial)
+    finally:
+        model.close()
+
+    # Evenly spaced rows, keeping the first and the last
+    if len(trajectory) > points:
+        last = len(trajectory) - 1
+        rows = [trajectory[round(i * last / (points - 1))] for i in range(points)]
+    else:
+        rows = trajectory
+    print(f"  {steps} steps in {elapsed:.2f}s, {len(rows)} points")
+
+    series = {"t": [round(row[0], time_precision) for row in rows], "y": []}
+    column = 1
+    for i, sublist in enumerate(traces):
+        figure_series = []
+        for j, trace in enumerate(sublist):
+            figure_series.append([quantize(row[column] * trace["multiplier"], precisions[i][j]) for row in rows])
+            column += 1
+        series["y"].append(figure_series)
+    return series
+
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<link rel="stylesheet" href="{bootstrap}">
+<link rel="stylesheet" href="{icons}">
+<script src="{mathjax}"></script>
+<script src="../plotly.min.js"></script>
+</head>
+<body>
+<div class="container-fluid">
+  <h2 class="text-center bg-primary text-white p-2">{title}</h2>
+  <div class="row ms-1">
+    <div class="col-4 mt-4 border p-2">
+      <div class="mb-3">
+        <button id="play-pause-button" class="btn btn-primary me-2"><i class="fas fa-play"></i></button>
+        <button id="show-all-button" class="btn btn-warning"><i class="fas fa-forward"></i></button>
+      </div>
+      <table class="table table-bordered table-striped">
+        <thead><tr><th>Policy</th><th>Value</th></tr></thead>
+        <tbody>{policy_rows}</tbody>
+      </table>
+      <h5 class="mt-4">Scenarios</h5>
+      <ul>{scenario_links}</ul>
+      <p class="text-muted">Precomputed scenario. Use the <a href="{dashboard}">live dashboard</a> to change policies while the simulation runs.</p>
+    </div>
+    <div class="col-8 pt-4">
+      <div style="width: 50%; display: inline-block">{left_graphs}</div><div style="width: 50%; display: inline-block">{right_graphs}</div>
+    </div>
+  </div>
+</div>
+<script>
+const figures = {figures};
+const series = {series};
+const graphs = figures.map((fig, i) => {{
+    const div = document.getElementById('graph-' + i);
+    Plotly.newPlot(div, fig.data, fig.layout, {{responsive: true}});
+    return div;
+}});
+
+// Show the first n points of every trace
+let shown = 0;
+function show(n) {{
+    shown = Math.min(n, series.t.length);
+    const x = series.t.slice(0, shown);
+    graphs.forEach((div, i) => Plotly.restyle(div, {{
+        x: series.y[i].map(() => x),
+        y: series.y[i].map(values => values.slice(0, shown)),
+    }}));
+}}
+
+// Play the scenario back over about ten seconds
+let timer = null;
+const button = document.getElementById('play-pause-button');
+function pause() {{
+    clearInterval(timer);
+    timer = null;
+    button.innerHTML = '<i class="fas fa-play"></i>';
+}}
+button.onclick = () => {{
+    if (timer) {{
+        pause();
+        return;
+    }}
+    if (shown >= series.t.length) {{
+        show(0);
+    }}
+    const chunk = Math.max(1, Math.ceil(series.t.length / 200));
+    timer = setInterval(() => {{
+        show(shown + chunk);
+        if (shown >= series.t.length) {{
+            pause();
+        }}
+    }}, 50);
+    button.innerHTML = '<i class="fas fa-pause"></i>';
+}};
+document.getElementById('show-all-button').onclick = () => {{
+    pause();
+    show(series.t.length);
+}};
+show(series.t.length);
+</script>
+</body>
+</html>
+"""
+
+INDEX = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Minsky Economic Model Scenarios</title>
+<link rel="stylesheet" href="{bootstrap}">
+</head>
+<body>
+<div class="container">
+  <h2 class="text-center bg-primary text-white p-2">Minsky Economic Model Scenarios</h2>
+  <p class="mt-3">Precomputed scenarios. Use the <a href="{dashboard}">live dashboard</a> to change policies while the simulation runs.</p>
+  <table class="table table-bordered table-striped mt-4">
+    <thead><tr><th>Scenario</th><th>Policies</th></tr></thead>
+    <tbody>{rows}</tbody>
+  </table>
+</div>
+</body>
+</html>
+"""
+
+
+def json_script(value):
+    # JSON safe to embed in a <script> element
+    return json.dumps(value, separators=(',', ':')).replace('</', '<\\/')
+
+
+def policy_text(sliders, values):
+    return ", ".join(f"{slider['label']}: {values[slider['id']]}" for slider in sliders if slider["id"] in values) or "Model defaults"
+
+
+def render_page(name, scenarios, sliders, figures, series, dashboard_url):
+    graph_divs = [f'<div id="graph-{i}"></div>' for i in range(len(figures))]
+    half = (len(graph_divs) + 1) // 2
+    values = scenarios[name]
+    policy_rows = "".join(
+        f"<tr><td>{html.escape(slider['label'])}</td><td>{values[slider['id']]}</td></tr>"
+        for slider in sliders if slider["id"] in values
+    ) or '<tr><td colspan="2">Model defaults</td></tr>'
+    scenario_links = "".join(
+        f'<li><a href="../{other}/">{html.escape(scenario_label(other))}</a></li>' if other != name
+        else f'<li><b>{html.escape(scenario_label(other))}</b></li>'
+        for other in scenarios
+    )
+    return PAGE.format(
+        title=html.escape(f"Minsky Economic Model Simulation: {scenario_label(name)}"),
+        bootstrap=dbc.themes.SPACELAB,
+        icons=dbc.icons.FONT_AWESOME,
+        mathjax=MATHJAX_URL,
+        dashboard=html.escape(dashboard_url),
+        policy_rows=policy_rows,
+        scenario_links=scenario_links,
+        left_graphs="".join(graph_divs[:half]),
+        right_graphs="".join(graph_divs[half:]),
+        figures="[" + ",".join(fig.to_json() for fig in figures).replace('</', '<\\/') + "]",
+        series=json_script(series),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build static scenario bundles")
+    parser.add_argument("--config", default="config.json", help="Dashboard config with the model file, figures and slider presets")
+    parser.add_argument("--out", default="scenarios", help="Directory to write the bundles to")
+    parser.add_argument("--t-end", type=float, default=100, help="Simulation time to run each scenario to")
+    parser.add_argument("--points", type=int, default=1000, help="Maximum points stored per trace (at least 2)")
+    parser.add_argument("--dashboard-url", default="/", help="URL of the live dashboard, linked from every page")
+    parser.add_argument("--scenario", nargs="+", help="Only build these scenarios")
+    args = parser.parse_args()
+    if args.points < 2:
+        parser.error("--points must be at least 2")
+
+    figs, sliders, settings = load_config(args.config)
+    model_file = settings.get('model_file', "BOMDwithGovernmentLive.mky")
+    solver_profiles, default_profile = load_solver_profiles(settings)
+    wire = load_wire_settings(settings)
+    traces = make_traces(figs)
+    precisions = [[trace.get("precision", wire["precision"]) for trace in sublist] for sublist in traces]
+    figures = list(create_figures(figs).values())
+
+    scenarios = load_scenarios(sliders)
+    selected = args.scenario or list(scenarios)
+    unknown = set(selected) - set(scenarios)
+    if unknown:
+        parser.error(f"Unknown scenarios {sorted(unknown)}, expected some of {list(scenarios)}")
+
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "plotly.min.js"), 'w') as f:
+        f.write(get_plotlyjs())
+
+    for name in selected:
+        print(f"Scenario {name}: {policy_text(sliders, scenarios[name])}")
+        series = run_scenario(model_file, solver_profiles[default_profile], sliders, scenarios[name], traces,
+                              args.t_end, args.points, precisions, wire["time_precision"])
+        os.makedirs(os.path.join(args.out, name), exist_ok=True)
+        with open(os.path.join(args.out, name, "index.html"), 'w') as f:
+            f.write(render_page(name, scenarios, sliders, figures, series, args.dashboard_url))
+
+    rows = "".join(
+        f'<tr><td><a href="{name}/">{html.escape(scenario_label(name))}</a></td><td>{html.escape(policy_text(sliders, scenarios[name]))}</td></tr>'
+        for name in scenarios if os.path.exists(os.path.join(args.out, name, "index.html"))
+    )
+    with open(os.path.join(args.out, "index.html"), 'w') as f:
+        f.write(INDEX.format(bootstrap=dbc.themes.SPACELAB, dashboard=html.escape(args.dashboard_url), rows=rows))
+    print(f"Scenario bundles written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import threading
+from array import array
+
+# Backpressure policies for the frame channel
+DROP_OLDEST = "drop-oldest"  # Overwrite the oldest pending frame when full
+COALESCE = "coalesce"        # Keep only the most recent frame
+BLOCK = "block"              # Wait for the consumer (optionally with a timeout)
+POLICIES = (DROP_OLDEST, COALESCE, BLOCK)
+
+
+class FrameChannel:
+    """
+    Bounded channel of simulation frames between the simulation thread and the Dash callbacks.
+
+    Frames are flat rows of floats (simulation time followed by every trace value) stored
+    in a single preallocated array, so publishing a frame does not allocate. What happens
+    when the channel is full is decided by the policy, so the producer never stalls on a
+    consumer that has stopped polling unless the BLOCK policy is selected.
+
+    Args:
+        width (int): Number of values in a frame
+        capacity (int): Maximum number of pending frames (forced to 1 for COALESCE)
+        policy (str): One of DROP_OLDEST, COALESCE or BLOCK
+        block_timeout (float): Seconds to wait under BLOCK before dropping the oldest frame.
+            None waits indefinitely.
+    """
+
+    def __init__(self, width, capacity=5, policy=DROP_OLDEST, block_timeout=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown frame channel policy {policy!r}, expected one of {POLICIES}")
+        if width < 1 or capacity < 1:
+            raise ValueError("Frame channel width and capacity must be positive")
+
+        self.width = width
+        self.capacity = 1 if policy == COALESCE else capacity
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._frames = array('d', bytes(8 * self.width * self.capacity))
+        self._head = 0   # slot of the oldest pending frame
+        self._count = 0  # number of pending frames
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+
+        # Counters
+        self.published = 0
+        self.consumed = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def _write_slot(self, slot, frame):
+        offset = slot * self.width
+        self._frames[offset:offset + self.width] = frame
+
+    def _read_slot(self, slot):
+        offset = slot * self.width
+        return self._frames[offset:offset + self.width]
+
+    def publish(self, frame):
+        """
+        Copy a frame into the channel, applying the backpressure policy if it is full.
+
+        Args:
+            frame (array): Array of doubles of length width (reused by the caller)
+
+        Returns:
+            bool: True if no pending frame had to be discarded
+        """
+        if len(frame) != self.width:
+            raise ValueError(f"Frame has {len(frame)} values, channel expects {self.width}")
+
+        with self._lock:
+            lossless = True
+            if self._count == self.capacity:
+                if self.policy == BLOCK:
+                    self._not_full.wait_for(lambda: self._count < self.capacity, self.block_timeout)
+                if self._count == self.capacity:
+                    # Discard the oldest frame to make room
+                    self._head = (self._head + 1) % self.capacity
+                    self._count -= 1
+                    lossless = False
+                    if self.policy == COALESCE:
+                        self.coalesced += 1
+                    else:
+                        self.dropped += 1
+
+            self._write_slot((self._head + self._count) % self.capacity, frame)
+            self._count += 1
+            self.published += 1
+            return lossless
+
+    def latest(self):
+        """
+        Take the most recent frame and discard any older pending frames.
+
+        Returns:
+            array: Copy of the newest frame, or None if the channel is empty
+        """
+        with self._lock:
+            if self._count == 0:
+                return None
+            frame = self._read_slot((self._head + self._count - 1) % self.capacity)
+            self.consumed += 1
+            self.coalesced += self._count - 1
+            self._head = 0
+            self._count = 0
+            self._not_full.notify_all()
+            return frame
+
+    def drain(self, max_frames=None):
+        """
+        Take all pending frames, oldest first.
+
+        Args:
+            max_frames (int): Only take the newest max_frames frames, discarding older ones
+
+        Returns:
+            list: Copies of the pending frames
+        """
+        with self._lock:
+            skip = 0 if max_frames is None else max(self._count - max_frames, 0)
+            frames = [self._read_slot((self._head + i) % self.capacity) for i in range(skip, self._count)]
+            self.consumed += len(frames)
+            self.coalesced += skip
+            self._head = 0
+            self._count = 0
+            self._not_full.notify_all()
+            return frames
+
+    def clear(self):
+        """Discard pending frames without counting them as dropped (e.g. on rerun)."""
+        with self._lock:
+            self._head = 0
+            self._count = 0
+            self._not_full.notify_all()
+
+    def qsize(self):
+        with self._lock:
+            return self._count
+
+    def stats(self):
+        """
+        Returns:
+            dict: Policy, capacity, current depth and frame counters
+        """
+        with self._lock:
+            return {
+                'policy': self.policy,
+                'capacity': self.capacity,
+                'depth': self._count,
+                'published': self.published,
+                'consumed': self.consumed,
+                'dropped': self.dropped,
+                'coalesced': self.coalesced,
+            }
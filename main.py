@@ -1,20 +1,54 @@
+import json
+import os
 import uvicorn
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.wsgi import WSGIMiddleware
 from fastapi.staticfiles import StaticFiles
-from app_dash1 import app as dashboard1
-# from app2 import app as dashboard2
+from app_dash1 import create_app
+
+
+# Load the dashboards to serve, each with its own path and config file, and server settings
+def load_server_config():
+    with open('dashboards.json', 'r') as f:
+        return json.load(f)
+
+server_config = load_server_config()
 
 
 # Define the FastAPI server
 app = FastAPI()
 
+# Compress responses, including the mounted Dash apps ("gzip", "br" or null)
+compression = server_config.get('compression', {})
+method = compression.get('method')
+minimum_size = compression.get('minimum_size', 500)
+if method == 'br':
+    try:
+        from brotli_asgi import BrotliMiddleware
+        app.add_middleware(BrotliMiddleware, minimum_size=minimum_size, gzip_fallback=True)
+    except ImportError:
+        print("brotli-asgi is not installed, using gzip compression")
+        method = 'gzip'
+if method == 'gzip':
+    app.add_middleware(GZipMiddleware, minimum_size=minimum_size)
+
 # Mount static files
 # app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Mount the Dash app as a sub-application in the FastAPI server
-app.mount("/", WSGIMiddleware(dashboard1.server))
-# app.mount("/dashboard2", WSGIMiddleware(dashboard2.server))
+# Serve prebuilt scenario bundles (see build_scenarios.py), which need no live simulation
+scenarios = server_config.get('scenarios')
+scenarios_url = None
+if scenarios and os.path.isdir(scenarios['directory']):
+    app.mount(scenarios['path'], StaticFiles(directory=scenarios['directory'], html=True), name="scenarios")
+    scenarios_url = scenarios['path'].rstrip("/") + "/"
+
+# Mount each Dash app as a sub-application in the FastAPI server.
+# The root dashboard is mounted last so it does not shadow the others.
+for dashboard in sorted(server_config['dashboards'], key=lambda d: d["path"] == "/"):
+    path = dashboard["path"].rstrip("/") + "/"
+    dash_app = create_app(dashboard["config_file"], url_base_pathname=path, scenarios_url=scenarios_url)
+    app.mount(path.rstrip("/") or "/", WSGIMiddleware(dash_app.server))
 
 # Define the main API endpoint
 @app.get("/")
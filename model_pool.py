@@ -0,0 +1,332 @@
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Connection
+
+# pyminsky exposes a single `minsky` model per process, so every model instance lives in
+# its own worker process (this file run as a script) and is driven over a socket pair.
+# Workers are plain subprocesses rather than multiprocessing children so they neither
+# inherit the web server's threads nor re-import the server's main module.
+
+
+def _serve(conn, model_file):
+    """Worker process main loop: load and reset the model, then answer requests."""
+    from pyminsky import minsky
+
+    try:
+        minsky.load(model_file)
+        minsky.reset()
+    except Exception as e:
+        conn.send(('error', f"Failed to load {model_file}: {e!r}"))
+        return
+    conn.send(('ok', None))
+
+    while True:
+        try:
+            op, args = conn.recv()
+        except (EOFError, OSError):
+            break  # server went away
+        if op == 'close':
+            break
+        try:
+            if op == 'call':
+                name, call_args = args
+                result = getattr(minsky, name)(*call_args)
+            elif op == 'get':
+                result = minsky.variableValues[args].value()
+            elif op == 'set':
+                name, value = args
+                result = minsky.variableValues[name].setValue(value)
+            elif op == 'type':
+                result = minsky.variableValues[args].type()
+            elif op == 'keys':
+                result = list(minsky.variableValues.keys())
+            elif op == 'read':
+                result = [minsky.t()] + [minsky.variableValues[name].value() for name in args]
+            elif op == 'step_read':
+                steps, names = args
+                for _ in range(steps):
+                    minsky.step()
+                result = [minsky.t()] + [minsky.variableValues[name].value() for name in names]
+            elif op == 'run':
+                # Step until t_end, recording [t, values...] after every step.
+                # Only the steps are timed, not the reads, so elapsed measures the integrator.
+                t_end, names, max_steps = args
+                trajectory = []
+                steps = 0
+                elapsed = 0.0
+                while minsky.t() < t_end and steps < max_steps:
+                    start = time.perf_counter()
+                    minsky.step()
+                    elapsed += time.perf_counter() - start
+                    steps += 1
+                    trajectory.append([minsky.t()] + [minsky.variableValues[name].value() for name in names])
+                result = (steps, elapsed, trajectory)
+            else:
+                raise ValueError(f"Unknown request {op!r}")
+            conn.send(('ok', result))
+        except Exception as e:
+            conn.send(('error', repr(e)))
+    conn.close()
+
+
+class RemoteVariable:
+    def __init__(self, model, name):
+        self.model = model
+        self.name = name
+
+    def value(self):
+        return self.model._request('get', self.name)
+
+    def setValue(self, value):
+        return self.model._request('set', (self.name, value))
+
+    def type(self):
+        return self.model._request('type', self.name)
+
+
+class RemoteVariables:
+    def __init__(self, model):
+        self.model = model
+
+    def __getitem__(self, name):
+        return RemoteVariable(self.model, name)
+
+    def keys(self):
+        return self.model._request('keys', None)
+
+
+class RemoteMinsky:
+    """
+    A Minsky model loaded in its own worker process.
+
+    Mirrors the parts of the pyminsky `minsky` object used by the dashboards, plus
+    batched `read` and `step_and_read` calls that fetch many variables in one round trip.
+
+    Args:
+        model_file (str): Path of the .mky model to load
+    """
+
+    def __init__(self, model_file):
+        self.model_file = model_file
+        self.variableValues = RemoteVariables(self)
+        self._lock = threading.Lock()
+        parent_sock, child_sock = socket.socketpair()
+        self._process = subprocess.Popen(
+            [sys.executable, __file__, model_file, str(child_sock.fileno())],
+            pass_fds=[child_sock.fileno()],
+        )
+        child_sock.close()
+        self._conn = Connection(parent_sock.detach())
+        try:
+            self._response()  # blocks until the model is loaded and reset
+        except Exception:
+            self.close()
+            raise
+
+    def _response(self):
+        try:
+            status, result = self._conn.recv()
+        except EOFError:
+            raise RuntimeError(f"Minsky worker for {self.model_file} exited")
+        if status == 'error':
+            raise RuntimeError(result)
+        return result
+
+    def _request(self, op, args):
+        with self._lock:
+            self._conn.send((op, args))
+            return self._response()
+
+    def _call(self, name, *args):
+        return self._request('call', (name, args))
+
+    def t(self):
+        return self._call('t')
+
+    def running(self, *args):
+        return self._call('running', *args)
+
+    def step(self):
+        return self._call('step')
+
+    def reset(self):
+        return self._call('reset')
+
+    def order(self, *args):
+        return self._call('order', *args)
+
+    def implicit(self, *args):
+        return self._call('implicit', *args)
+
+    def stepMin(self, *args):
+        return self._call('stepMin', *args)
+
+    def stepMax(self, *args):
+        return self._call('stepMax', *args)
+
+    def epsAbs(self, *args):
+        return self._call('epsAbs', *args)
+
+    def epsRel(self, *args):
+        return self._call('epsRel', *args)
+
+    def read(self, names):
+        """Return [t, value of each variable in names] in one round trip."""
+        return self._request('read', names)
+
+    def step_and_read(self, steps, names):
+        """Run steps simulation steps, then return [t, value of each variable in names]."""
+        return self._request('step_read', (steps, names))
+
+    def run_until(self, t_end, names, max_steps=1000000):
+        """
+        Step the model until simulation time t_end, timing the steps inside the worker.
+
+        Returns:
+            tuple: (steps, seconds spent stepping (excluding the reads),
+                [[t, value of each variable in names], ...] after every step)
+        """
+        return self._request('run', (t_end, names, max_steps))
+
+    def kill(self):
+        # Stop a worker that does not answer, without waiting for a request in progress.
+        # That request then fails, and close() can proceed.
+        self._process.kill()
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.send(('close', None))
+            except (OSError, ValueError):
+                pass
+            self._conn.close()
+        try:
+            self._process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+
+
+class ModelPool:
+    """
+    Pool of pre-loaded, pre-reset instances of one Minsky model.
+
+    `acquire` hands out a warm model without loading the .mky file and a background
+    thread loads replacements until `size` models are ready again. Released models have
+    been stepped and had their parameters changed, so they are shut down rather than reused;
+    the shutdown also happens on the background thread, so `release` never waits on a worker.
+
+    Args:
+        model_file (str): Path of the .mky model to load
+        size (int): Number of warm models to keep ready. 0 loads a model on every acquire.
+    """
+
+    def __init__(self, model_file, size=2):
+        self.model_file = model_file
+        self.size = size
+        self._ready = deque()
+        self._released = deque()  # models waiting to be shut down by the refill thread
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._stop = threading.Event()
+        self._closed = False
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.loaded = 0
+
+        self._refill_thread = threading.Thread(target=self._refill, daemon=True)
+        self._refill_thread.start()
+        self._wanted.set()
+
+    def acquire(self):
+        """
+        Returns:
+            RemoteMinsky: A freshly loaded and reset model, owned by the caller
+        """
+        with self._lock:
+            model = self._ready.popleft() if self._ready else None
+            if model is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        self._wanted.set()
+        if model is None:
+            # Pool is empty, load one synchronously
+            model = RemoteMinsky(self.model_file)
+            with self._lock:
+                self.loaded += 1
+        return model
+
+    def release(self, model):
+        # Shut the model down on the refill thread
+        with self._lock:
+            self._released.append(model)
+        self._wanted.set()
+
+    def _close_released(self):
+        while True:
+            with self._lock:
+                if not self._released:
+                    return
+                model = self._released.popleft()
+            model.close()
+
+    def _refill(self):
+        backoff = 1
+        while True:
+            self._wanted.wait()
+            self._wanted.clear()
+            self._close_released()
+            while not self._closed and len(self._ready) < self.size:
+                try:
+                    model = RemoteMinsky(self.model_file)
+                except Exception as e:
+                    # Keep retrying, an acquire meanwhile loads synchronously
+                    print(f"Model pool failed to load {self.model_file}, retrying in {backoff}s: {e}")
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2, 30)
+                    self._close_released()
+                    continue
+                backoff = 1
+                with self._lock:
+                    self.loaded += 1
+                    if self._closed:
+                        model.close()
+                        break
+                    self._ready.append(model)
+                self._close_released()
+            if self._closed:
+                self._close_released()
+                return
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            models = list(self._ready)
+            self._ready.clear()
+        self._stop.set()
+        self._wanted.set()
+        for model in models:
+            model.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'model_file': self.model_file,
+                'size': self.size,
+                'ready': len(self._ready),
+                'released': len(self._released),
+                'hits': self.hits,
+                'misses': self.misses,
+                'loaded': self.loaded,
+            }
+
+
+if __name__ == "__main__":
+    # Worker entry point: model_pool.py <model_file> <socket fd>
+    _serve(Connection(int(sys.argv[2])), sys.argv[1])
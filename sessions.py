@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import deque
+
+
+class SessionLimitError(RuntimeError):
+    """Raised when a new session would exceed max_sessions and no session is idle enough to evict."""
+
+
+class SessionRegistry:
+    """
+    Per browser session state, created on first use and closed once the session goes idle.
+
+    Dash callbacks look their session up by the id kept in the browser's session storage.
+    A session that has not been used for `idle_timeout` seconds (the tab was closed) is
+    closed by a background thread. When a new session would exceed `max_sessions`, the
+    least recently used session is closed if it has been idle for `evict_after` seconds,
+    otherwise the new session is refused, so active sessions are never bumped.
+
+    Args:
+        create (callable): create(session_state) returns a new session
+        close (callable): close(session) shuts a session down, called on the background thread
+        idle_timeout (float): Seconds without a lookup before a session is closed
+        max_sessions (int): Maximum number of open sessions
+        evict_after (float): Seconds without a lookup before a session may be evicted
+    """
+
+    def __init__(self, create, close, idle_timeout=600, max_sessions=20, evict_after=60):
+        self.create = create
+        self.close = close
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.evict_after = evict_after
+        self._sessions = {}  # session id -> [session (None while being created), last seen, created event]
+        self._closing = deque()
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+
+        # Counters
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self.refused = 0
+
+        self._reaper_thread = threading.Thread(target=self._reap, daemon=True)
+        self._reaper_thread.start()
+
+    def get(self, session_id, session_state):
+        """
+        Returns:
+            The session for session_id, created from session_state if it is not open
+
+        Raises:
+            SessionLimitError: If the session is not open and max_sessions are in use
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                if len(self._sessions) >= self.max_sessions:
+                    self._evict(time.monotonic())
+                # Placeholder, so concurrent lookups of a new session wait for this creation
+                entry = self._sessions[session_id] = [None, time.monotonic(), threading.Event()]
+                creating = True
+            else:
+                entry[1] = time.monotonic()
+                creating = False
+
+        if not creating:
+            entry[2].wait()
+            if entry[0] is None:
+                raise RuntimeError(f"Session {session_id} could not be created")
+            return entry[0]
+
+        # Create outside the lock, it may have to load a model
+        try:
+            session = self.create(session_state)
+        except Exception:
+            with self._lock:
+                del self._sessions[session_id]
+            entry[2].set()
+            raise
+        with self._lock:
+            entry[0] = session
+            entry[1] = time.monotonic()
+            self.created += 1
+        entry[2].set()
+        return session
+
+    def _evict(self, now):
+        # Make room for a new session, called with the lock held
+        idle = [key for key, (session, last_seen, _) in self._sessions.items()
+                if session is not None and now - last_seen > self.evict_after]
+        if not idle:
+            self.refused += 1
+            raise SessionLimitError(f"All {self.max_sessions} sessions are in use")
+        oldest = min(idle, key=lambda key: self._sessions[key][1])
+        self._closing.append(self._sessions.pop(oldest)[0])
+        self.evicted += 1
+        self._wanted.set()
+
+    def _reap(self):
+        while True:
+            self._wanted.wait(min(self.idle_timeout / 2, 30))
+            self._wanted.clear()
+            now = time.monotonic()
+            with self._lock:
+                for session_id, (session, last_seen, _) in list(self._sessions.items()):
+                    if session is not None and now - last_seen > self.idle_timeout:
+                        del self._sessions[session_id]
+                        self._closing.append(session)
+                        self.expired += 1
+                closing = list(self._closing)
+                self._closing.clear()
+            for session in closing:
+                try:
+                    self.close(session)
+                except Exception as e:
+                    print(f"Failed to close session: {e}")
+
+    def sessions(self):
+        with self._lock:
+            return [session for session, _, _ in self._sessions.values() if session is not None]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'open': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'idle_timeout': self.idle_timeout,
+                'evict_after': self.evict_after,
+                'created': self.created,
+                'expired': self.expired,
+                'evicted': self.evicted,
+                'refused': self.refused,
+            }
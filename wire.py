@@ -0,0 +1,201 @@
+import gzip
+import json
+import math
+import threading
+
+from dash import Patch
+
+# Wire encodings for figure updates, see config.json settings.wire
+PATCH = "patch"      # Dash Patch appending to every trace (no client-side decoding)
+COMPACT = "compact"  # One delta-encoded batch decoded in the browser by DECODE_BATCH_JS
+ENCODINGS = (PATCH, COMPACT)
+
+DEFAULT_WIRE = {
+    "encoding": COMPACT,
+    "precision": 6,       # significant digits, overridable per trace with "precision"
+    "time_precision": 3,  # decimals kept for simulation time
+    "batch": 5,           # maximum frames sent per update
+    "stats_every": 10,    # measure the payload size of every Nth update for /stats, 0 disables
+}
+
+# Decimals shown in the latest values table
+LATEST_DECIMALS = 2
+
+
+def load_wire_settings(settings):
+    """
+    Get the wire settings from the config settings, filling in defaults.
+
+    Args:
+        settings (dict): The settings section of config.json
+
+    Returns:
+        dict: Wire settings with every key of DEFAULT_WIRE
+    """
+    wire = {**DEFAULT_WIRE, **settings.get('wire', {})}
+    if wire["encoding"] not in ENCODINGS:
+        raise ValueError(f"Unknown wire encoding {wire['encoding']!r}, expected one of {ENCODINGS}")
+    return wire
+
+
+def quantize(value, digits):
+    """
+    Round a value to a number of significant digits, so it serializes to a short JSON number.
+
+    Args:
+        value (float): The value to round
+        digits (int): Significant digits to keep
+
+    Returns:
+        float: The rounded value
+    """
+    if value == 0 or not math.isfinite(value):
+        return value
+    return round(value, digits - 1 - math.floor(math.log10(abs(value))))
+
+
+def frame_columns(frames, traces, trace_offsets, precisions):
+    # Quantized values of every trace across frames, grouped by figure: [figure][trace][frame]
+    return [
+        [
+            [quantize(frame[offset + j], precisions[i][j]) for frame in frames]
+            for j in range(len(sublist))
+        ]
+        for i, (sublist, offset) in enumerate(zip(traces, trace_offsets))
+    ]
+
+
+def patch_frames(frames, traces, trace_offsets, precisions, time_precision):
+    """
+    Build one Patch per figure appending a batch of frames to every trace.
+
+    Returns:
+        list: Patch objects, one per figure
+    """
+    scale = 10 ** time_precision
+    times = [round(frame[0] * scale) / scale for frame in frames]
+    patches = []
+    for columns in frame_columns(frames, traces, trace_offsets, precisions):
+        patched_fig = Patch()
+        for j, column in enumerate(columns):
+            patched_fig["data"][j]["x"].extend(times)
+            patched_fig["data"][j]["y"].extend(column)
+        patches.append(patched_fig)
+    return patches
+
+
+def encode_frames(frames, traces, trace_offsets, precisions, time_precision):
+    """
+    Encode a batch of frames as a compact payload for DECODE_BATCH_JS.
+
+    Simulation time is sent once per frame for all traces, as integer steps of
+    10**-time_precision relative to the previous frame.
+
+    Returns:
+        dict: {"tp": time_precision, "t0": first time, "dt": time deltas, "y": [figure][trace][frame] values}
+    """
+    ticks = [round(frame[0] * 10 ** time_precision) for frame in frames]
+    return {
+        "tp": time_precision,
+        "t0": ticks[0],
+        "dt": [b - a for a, b in zip(ticks, ticks[1:])],
+        "y": frame_columns(frames, traces, trace_offsets, precisions),
+    }
+
+
+# Clientside callback appending a batch from encode_frames to the figures given as State
+DECODE_BATCH_JS = """
+function(batch, ...figures) {
+    if (!batch) {
+        return figures.map(() => window.dash_clientside.no_update);
+    }
+    const scale = Math.pow(10, batch.tp);
+    let tick = batch.t0;
+    const x = [tick / scale];
+    for (const dt of batch.dt) {
+        tick += dt;
+        x.push(tick / scale);
+    }
+    return figures.map((fig, i) => Object.assign({}, fig, {
+        data: fig.data.map((trace, j) => Object.assign({}, trace, {
+            x: (trace.x || []).concat(x),
+            y: (trace.y || []).concat(batch.y[i][j]),
+        })),
+    }));
+}
+"""
+
+
+def encode_latest(values, decimals=LATEST_DECIMALS):
+    """
+    Encode the latest values table (simulation time, then every trace) as one list for
+    FORMAT_LATEST_JS, rounded to the decimals the table shows.
+
+    Returns:
+        list: The rounded values
+    """
+    return [round(value, decimals) if math.isfinite(value) else None for value in values]
+
+
+# Clientside callback filling the latest values table cells from an encode_latest list
+FORMAT_LATEST_JS = """
+function(values) {
+    const outputs = window.dash_clientside.callback_context.outputs_list;
+    if (!values) {
+        return outputs.map(() => window.dash_clientside.no_update);
+    }
+    return values.map(value => value === null ? '' : value.toFixed(%d));
+}
+""" % LATEST_DECIMALS
+
+
+def payload_bytes(payload):
+    # Size of a callback payload as Dash would serialize it
+    return json.dumps(payload, separators=(',', ':'), default=lambda o: o.to_plotly_json()).encode()
+
+
+class WireStats:
+    """
+    Counts figure updates and frames sent, and estimates payload bytes per frame, before
+    and after gzip, from every sample_every-th update (0 disables the measurement), so
+    serializing and compressing for the counters stays off most requests.
+    """
+
+    def __init__(self, encoding, sample_every=10):
+        self.encoding = encoding
+        self.sample_every = sample_every
+        self.updates = 0
+        self.frames = 0
+        self.sampled_updates = 0
+        self.sampled_frames = 0
+        self.bytes = 0
+        self.gzip_bytes = 0
+        self._lock = threading.Lock()
+
+    def record(self, payload, frames):
+        with self._lock:
+            self.updates += 1
+            self.frames += frames
+            if not self.sample_every or self.updates % self.sample_every:
+                return
+        data = payload_bytes(payload)
+        compressed = len(gzip.compress(data))
+        with self._lock:
+            self.sampled_updates += 1
+            self.sampled_frames += frames
+            self.bytes += len(data)
+            self.gzip_bytes += compressed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'encoding': self.encoding,
+                'updates': self.updates,
+                'frames': self.frames,
+                'sampled_updates': self.sampled_updates,
+                'sampled_frames': self.sampled_frames,
+                'bytes': self.bytes,
+                'gzip_bytes': self.gzip_bytes,
+                'bytes_per_frame': self.bytes / self.sampled_frames if self.sampled_frames else None,
+                'gzip_bytes_per_frame': self.gzip_bytes / self.sampled_frames if self.sampled_frames else None,
+            }